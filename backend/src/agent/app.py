@@ -1,9 +1,13 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
-import pathlib
-from fastapi import FastAPI, Request, Response
-from fastapi.staticfiles import StaticFiles
-import fastapi.exceptions
-from fastapi.middleware.cors import CORSMiddleware
+import functools
+import mimetypes
+import mmap
+import os
+import stat
+from fastapi import FastAPI, Response
+
+from agent.http_client import aclose_client
+from agent.search_tools import close_session
 
 # Define the FastAPI app for agent-specific routes
 agent_fastapi_app = FastAPI(
@@ -20,14 +24,80 @@ origins = [
     "http://127.0.0.1:5173", # Also common for localhost
 ]
 
+# CORS header values are fixed, so encode them once at import time
+_ALLOW_CREDENTIALS = (b"access-control-allow-credentials", b"true")
+_ALLOW_METHODS = (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT")
+_MAX_AGE = (b"access-control-max-age", b"600")
+_VARY_ORIGIN = (b"vary", b"Origin")
+
+
+class FastCORS:
+    """Pure-ASGI CORS middleware for the agent routes.
+
+    Avoids the Request/Response wrapping of the stock middleware: the origin is
+    read straight from the raw scope headers and the CORS headers are appended
+    to the ``http.response.start`` message.
+    """
+
+    def __init__(self, app, origins):
+        self.app = app
+        # Full header lists per allowed origin, built once; membership in
+        # these dicts doubles as the origin check.
+        self._simple_headers = {}
+        self._preflight_headers = {}
+        for o in origins:
+            allow_origin = (b"access-control-allow-origin", o.encode())
+            self._simple_headers[allow_origin[1]] = (allow_origin, _ALLOW_CREDENTIALS, _VARY_ORIGIN)
+            self._preflight_headers[allow_origin[1]] = (
+                allow_origin, _ALLOW_CREDENTIALS, _ALLOW_METHODS, _MAX_AGE, _VARY_ORIGIN,
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                request_method = value
+            elif key == b"access-control-request-headers":
+                request_headers = value
+
+        cors_headers = self._simple_headers.get(origin)
+        if cors_headers is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            # Preflight: answer directly without calling downstream.
+            headers = list(self._preflight_headers[origin])
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
 # Add CORS middleware
-agent_fastapi_app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+agent_fastapi_app.add_middleware(FastCORS, origins=origins)
+
+
+@agent_fastapi_app.on_event("shutdown")
+async def close_http_client():
+    await aclose_client()
+    close_session()
 
 # ... (Definition deiner Routen für agent_fastapi_app, falls vorhanden) ...
 # agent_fastapi_app.include_router(...)
@@ -36,21 +106,116 @@ agent_fastapi_app.add_middleware(
 # damit langgraph dev sie finden kann.
 app = agent_fastapi_app
 
+class SPAStatic:
+    """Pure-ASGI server for the React build.
+
+    Files are opened once, memory-mapped and kept in a bounded LRU cache
+    together with their size, ETag and content type, so repeated asset
+    requests do no filesystem work at all. Paths that do not map to a file
+    fall back to the cached ``index.html`` for client-side routing, except
+    paths with a file extension (e.g. a missing ``assets/*.js``), which are
+    404s; misses are cached too. Builds are immutable, so there is no invalidation:
+    restart the process on deploy.
+    """
+
+    chunk_size = 64 * 1024
+    cache_size = 1024
+
+    def __init__(self, build_path):
+        self.build_path = os.path.realpath(build_path)
+        self._index = self._load(os.path.join(self.build_path, "index.html"))
+        # route path -> (body, size, etag, content_type)
+        self._lookup = functools.lru_cache(maxsize=self.cache_size)(self._resolve)
+
+    def _load(self, fp):
+        try:
+            fd = os.open(fp, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                return None
+            body = mmap.mmap(fd, 0, access=mmap.ACCESS_READ) if st.st_size else b""
+        finally:
+            os.close(fd)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'.encode()
+        content_type = mimetypes.guess_type(fp)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        return body, st.st_size, etag, content_type.encode()
+
+    def _resolve(self, route_path):
+        rel_path = os.path.normpath(route_path.lstrip("/"))
+        # Client-side routes have no extension; a missing file is a real 404
+        fallback = None if os.path.splitext(rel_path)[1] else self._index
+        if rel_path.startswith("..") or os.path.isabs(rel_path):
+            return fallback
+        return self._load(os.path.join(self.build_path, rel_path)) or fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await send({"type": "http.response.start", "status": 405, "headers": [(b"allow", b"GET, HEAD")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        # Mirror Starlette's get_route_path: strip the mount prefix if present.
+        root_path = scope.get("root_path", "")
+        route_path = scope["path"]
+        if root_path and route_path.startswith(root_path):
+            route_path = route_path[len(root_path):]
+
+        entry = self._lookup(route_path)
+        if entry is None:
+            await send({
+                "type": "http.response.start",
+                "status": 404,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", b"9")],
+            })
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else b"Not Found"})
+            return
+        body, size, etag, content_type = entry
+        headers = [(b"content-type", content_type), (b"etag", etag)]
+
+        for key, value in scope["headers"]:
+            if key == b"if-none-match" and value == etag:
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        headers.append((b"content-length", str(size).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD" or not size:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        for offset in range(0, size, self.chunk_size):
+            end = offset + self.chunk_size
+            await send({"type": "http.response.body", "body": body[offset:end], "more_body": end < size})
+
+
+# Resolved once at import; build_dir arguments are relative to the backend directory
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_BACKEND_DIR = os.path.normpath(os.path.join(_MODULE_DIR, "..", ".."))
+
+
 def create_frontend_router(build_dir="../frontend/dist"):
     """Creates a router to serve the React frontend.
 
     Args:
-        build_dir: Path to the React build directory relative to this file.
+        build_dir: Path to the React build directory relative to the backend directory.
 
     Returns:
-        A Starlette application serving the frontend.
+        An ASGI application serving the frontend.
     """
-    build_path = pathlib.Path(__file__).parent.parent.parent / build_dir
-    static_files_path = build_path / "assets"  # Vite uses 'assets' subdir
+    build_str = os.path.normpath(os.path.join(_BACKEND_DIR, build_dir))
+    index_str = os.path.join(build_str, "index.html")
 
-    if not build_path.is_dir() or not (build_path / "index.html").is_file():
+    # A regular index.html implies the build directory exists: one stat, not two.
+    if not os.path.isfile(index_str):
         print(
-            f"WARN: Frontend build directory not found or incomplete at {build_path}. Serving frontend will likely fail."
+            f"WARN: Frontend build directory not found or incomplete at {build_str}. Serving frontend will likely fail."
         )
         # Return a dummy router if build isn't ready
         from starlette.routing import Route
@@ -64,21 +229,7 @@ def create_frontend_router(build_dir="../frontend/dist"):
 
         return Route("/{path:path}", endpoint=dummy_frontend)
 
-    build_dir = pathlib.Path(build_dir)
-
-    react = FastAPI(openapi_url="")
-    react.mount(
-        "/assets", StaticFiles(directory=static_files_path), name="static_assets"
-    )
-
-    @react.get("/{path:path}")
-    async def handle_catch_all(request: Request, path: str):
-        fp = build_path / path
-        if not fp.exists() or not fp.is_file():
-            fp = build_path / "index.html"
-        return fastapi.responses.FileResponse(fp)
-
-    return react
+    return SPAStatic(build_str)
 
 
 # Mount the frontend under /app to not conflict with the LangGraph API routes
@@ -1,9 +1,13 @@
+import functools
+import logging
 import os
 from pydantic import BaseModel, Field
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 
 from langchain_core.runnables import RunnableConfig
 
+logger = logging.getLogger(__name__)
+
 class Configuration(BaseModel):
     """The configuration for the agent."""
 
@@ -70,53 +74,85 @@ class Configuration(BaseModel):
         2. config["configurable"] (values from RunnableConfig, typically LangGraph internal)
         3. Environment variables
         4. Pydantic defaults
+
+        Every graph node calls this with the same overrides during a run, so
+        instances are memoized on the (hashable) override items. The returned
+        instance is shared and must not be mutated.
         """
-        lg_configurable = ( # LangGraph's internal configurable
-            config["configurable"] if config and "configurable" in config else {}
-        )
         state_override = state_config_override if state_config_override is not None else {}
 
-        print(f"--- [DEBUG] from_runnable_config ---")
-        print(f"--- [DEBUG] state_config_override received: {state_override}")
-        print(f"--- [DEBUG] LangGraph's internal config object: {config}")
-        print(f"--- [DEBUG] LangGraph's internal 'configurable' dict: {lg_configurable}")
+        if logger.isEnabledFor(logging.DEBUG):
+            lg_configurable = ( # LangGraph's internal configurable
+                config["configurable"] if config and "configurable" in config else {}
+            )
+            logger.debug("from_runnable_config: state_config_override received: %s", state_override)
+            logger.debug("from_runnable_config: LangGraph's internal config object: %s", config)
+            logger.debug("from_runnable_config: LangGraph's internal 'configurable' dict: %s", lg_configurable)
 
-        raw_values: dict[str, Any] = {}
-        
-        for name in cls.model_fields.keys():
-            value: Any = None
-            source: str = "Pydantic default"
-
-            # 1. Check state_config_override
-            if name in state_override and state_override[name] is not None:
-                value = state_override[name]
-                source = "state_config_override"
-            else:
-                # 2. Check LangGraph's internal configurable (less likely to contain our UI settings)
-                # We've seen this doesn't contain UI settings, but keeping for completeness of original logic.
-                # This is unlikely to be useful for UI-driven config.
-                # if name in lg_configurable and lg_configurable[name] is not None:
-                #     value = lg_configurable[name]
-                #     source = "LangGraph internal configurable"
-                # else:
-                # 3. Check environment variables
-                env_var_name = name.upper()
-                env_value = os.environ.get(env_var_name)
-                if env_value is not None:
-                    value = env_value
-                    source = f"environment variable ({env_var_name})"
-            
-            print(f"--- [DEBUG] For '{name}': resolved value '{value}' from '{source}'")
-            raw_values[name] = value # Value can be None here if not found anywhere yet
-
-        init_kwargs: dict[str, Any] = {}
-        for name, raw_value in raw_values.items():
-            if raw_value is not None: 
-                init_kwargs[name] = raw_value
-        
-        print(f"--- [DEBUG] Final init_kwargs for Configuration: {init_kwargs}")
+        # 'configurable' is not consulted (see _build_config), so it is not
+        # part of the cache key.
+        frozen_state = tuple(sorted(
+            (name, value) for name, value in state_override.items()
+            if name in cls.model_fields and value is not None
+        ))
+        try:
+            return _build_config(cls, frozen_state)
+        except TypeError: # Unhashable override value, build without the cache
+            return _build_config.__wrapped__(cls, frozen_state)
+
+
+@functools.lru_cache(maxsize=1)
+def _env_snapshot(cls: type[Configuration]) -> Dict[str, Optional[str]]:
+    """Read the environment variables for all fields once.
+
+    Taken lazily on the first build rather than at import, so values loaded
+    by ``load_dotenv`` in ``agent.graph`` are included.
+    """
+    return {name: os.environ.get(name.upper()) for name in cls.model_fields}
+
+
+@functools.lru_cache(maxsize=64)
+def _build_config(
+    cls: type[Configuration], frozen_state: Tuple[Tuple[str, Any], ...]
+) -> Configuration:
+    state_override = dict(frozen_state)
+    env_values = _env_snapshot(cls)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    raw_values: dict[str, Any] = {}
+    
+    for name in cls.model_fields.keys():
+        value: Any = None
+        source: str = "Pydantic default"
+
+        # 1. Check state_config_override
+        if name in state_override:
+            value = state_override[name]
+            source = "state_config_override"
+        else:
+            # 2. Check LangGraph's internal configurable (less likely to contain our UI settings)
+            # We've seen this doesn't contain UI settings, but keeping for completeness of original logic.
+            # This is unlikely to be useful for UI-driven config.
+            # if name in lg_configurable and lg_configurable[name] is not None:
+            #     value = lg_configurable[name]
+            #     source = "LangGraph internal configurable"
+            # else:
+            # 3. Check environment variables
+            env_value = env_values[name]
+            if env_value is not None:
+                value = env_value
+                source = f"environment variable ({name.upper()})"
         
-        instance = cls(**init_kwargs)
-        print(f"--- [DEBUG] Created Configuration instance (model_dump): {instance.model_dump()}")
-        print(f"--- [DEBUG] --- end from_runnable_config ---")
-        return instance
+        if debug:
+            logger.debug("For '%s': resolved value '%s' from '%s'", name, value, source)
+        raw_values[name] = value # Value can be None here if not found anywhere yet
+
+    init_kwargs: dict[str, Any] = {}
+    for name, raw_value in raw_values.items():
+        if raw_value is not None: 
+            init_kwargs[name] = raw_value
+    
+    instance = cls(**init_kwargs)
+    if debug:
+        logger.debug("Final init_kwargs for Configuration: %s", init_kwargs)
+        logger.debug("Created Configuration instance (model_dump): %s", instance.model_dump())
+    return instance
@@ -1,4 +1,6 @@
+import functools
 import os
+import re
 
 from agent.tools_and_schemas import SearchQueryList, Reflection
 from dotenv import load_dotenv
@@ -6,26 +8,32 @@ from langchain_core.messages import AIMessage
 from langgraph.types import Send
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
-from langchain_core.runnables import RunnableConfig
-from google.genai import Client # type: ignore
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import SecretStr # Import SecretStr
 
 from agent.state import (
     OverallState,
+    Source,
+    WebSearchState,
 )
 from agent.configuration import Configuration
-from typing import Optional, Dict, Any, List, Union
-
-from langchain_openai import ChatOpenAI
-from agent.search_tools import brave_search, searxng_search
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, NamedTuple, Union
+
+from agent.search_tools import (
+    SearchResults,
+    brave_search,
+    brave_search_async,
+    searxng_search,
+    searxng_search_async,
+)
 from agent.prompts import (
     get_current_date,
     query_writer_instructions,
     web_searcher_instructions,
     reflection_instructions,
     answer_instructions,
+    compile_prompt,
 )
-from langchain_google_genai import ChatGoogleGenerativeAI
 from agent.utils import (
     get_citations,
     get_research_topic,
@@ -33,8 +41,19 @@ from agent.utils import (
     resolve_urls,
 )
 
+if TYPE_CHECKING:
+    # The provider SDKs are slow to import; load them only when first used
+    from google.genai import Client # type: ignore
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_openai import ChatOpenAI
+
 load_dotenv(override=True)
 
+_QUERY_WRITER_PROMPT = compile_prompt(query_writer_instructions)
+_WEB_SEARCHER_PROMPT = compile_prompt(web_searcher_instructions)
+_REFLECTION_PROMPT = compile_prompt(reflection_instructions)
+_ANSWER_PROMPT = compile_prompt(answer_instructions)
+
 _initial_app_config_for_checks = Configuration.from_runnable_config()
 gemini_api_key_env = os.getenv("GEMINI_API_KEY")
 
@@ -43,26 +62,98 @@ if _initial_app_config_for_checks.llm_provider == "google" and not gemini_api_ke
         "GEMINI_API_KEY is not set in .env, but Google is the configured LLM provider."
     )
 
-genai_client: Optional[Client] = None
-if gemini_api_key_env:
-    genai_client = Client(api_key=gemini_api_key_env)
-elif _initial_app_config_for_checks.search_api_provider == "google" and _initial_app_config_for_checks.llm_provider != "google":
+if not gemini_api_key_env and _initial_app_config_for_checks.search_api_provider == "google" and _initial_app_config_for_checks.llm_provider != "google":
     raise ValueError(
         "GEMINI_API_KEY is not set in .env, but Google is the configured Search API provider."
     )
 
+@functools.cache
+def _get_genai_client() -> "Client":
+    """Create the Google GenAI client on first use."""
+    if not gemini_api_key_env:
+        raise ValueError("Google GenAI client not initialized. Check GEMINI_API_KEY.")
+    from google.genai import Client # type: ignore
+    return Client(api_key=gemini_api_key_env)
+
+class LLMSpec(NamedTuple):
+    """Per-node model settings passed to the LLM builders."""
+    model: str
+    temperature: float
+
+LLM = Union["ChatOpenAI", "ChatGoogleGenerativeAI"]
+
+def _build_custom(spec: LLMSpec, base_url: Optional[str], api_key: Optional[str]) -> LLM:
+    if not base_url:
+        raise ValueError("LLM_API_BASE_URL must be set for custom LLM provider.")
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=spec.model,
+        base_url=base_url,
+        api_key=SecretStr(api_key) if api_key else None,
+        temperature=spec.temperature, max_retries=2,
+    )
+
+def _build_openai(spec: LLMSpec, base_url: Optional[str], api_key: Optional[str]) -> LLM:
+    from langchain_openai import ChatOpenAI
+    openai_api_key = api_key or os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(
+        model=spec.model,
+        api_key=SecretStr(openai_api_key) if openai_api_key else None,
+        temperature=spec.temperature, max_retries=2,
+    )
+
+def _build_google(spec: LLMSpec, base_url: Optional[str], api_key: Optional[str]) -> LLM:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=spec.model,
+        temperature=spec.temperature, max_retries=2,
+        api_key=os.getenv("GEMINI_API_KEY"),
+    )
+
+def _build_default(spec: LLMSpec, base_url: Optional[str], api_key: Optional[str]) -> LLM:
+    # Unknown providers fall back to Google models with the SDK's own key lookup
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=spec.model,
+        temperature=spec.temperature, max_retries=2,
+        api_key=None,
+    )
+
+_LLM_BUILDERS = {
+    "custom": _build_custom,
+    "openai": _build_openai,
+    "google": _build_google,
+}
+
+@functools.lru_cache(maxsize=32)
+def _get_llm(
+    provider: str,
+    spec: LLMSpec,
+    base_url: Optional[str],
+    api_key: Optional[str],
+) -> LLM:
+    """Build the chat model for a provider, reusing it across nodes and runs.
+
+    Keyed on every setting that affects the client, so identical settings
+    share one instance (and its HTTP connection pool).
+    """
+    return _LLM_BUILDERS.get(provider, _build_default)(spec, base_url, api_key)
+
+_CFG_KEYS = (
+    "llm_provider", "llm_api_base_url", "llm_api_key", "llm_model_name",
+    "search_api_provider", "search_api_key", "searxng_base_url",
+    "number_of_initial_queries", "max_research_loops",
+)
+
 def _get_config_from_state(state: OverallState) -> Dict[str, Any]:
-    cfg_keys = [
-        "llm_provider", "llm_api_base_url", "llm_api_key", "llm_model_name",
-        "search_api_provider", "search_api_key", "searxng_base_url",
-        "number_of_initial_queries", "max_research_loops"
-    ]
-    state_cfg: Dict[str, Any] = {}
-    for key in cfg_keys:
-        value = state.get(key)
-        if value is not None:
-            state_cfg[key] = value
-    return state_cfg
+    return {key: value for key in _CFG_KEYS if (value := state.get(key)) is not None}
+
+def _research_topic(state: OverallState) -> str:
+    """Return the topic stored by generate_query, deriving it only if missing."""
+    research_topic = state.get("research_topic")
+    if research_topic is None:
+        research_topic = get_research_topic(state.get("messages", []))
+    return research_topic
 
 # Nodes
 def generate_query(state: OverallState, config: RunnableConfig) -> dict:
@@ -73,40 +164,17 @@ def generate_query(state: OverallState, config: RunnableConfig) -> dict:
     if initial_query_count is None:
         initial_query_count = app_config.number_of_initial_queries
 
-    llm_api_key_to_use: Optional[SecretStr] = None
-    if app_config.llm_api_key:
-        llm_api_key_to_use = SecretStr(app_config.llm_api_key)
-    
-    openai_api_key_env: Optional[SecretStr] = None
-    openai_env_val = os.getenv("OPENAI_API_KEY")
-    if openai_env_val:
-        openai_api_key_env = SecretStr(openai_env_val)
-
-    llm: Union[ChatOpenAI, ChatGoogleGenerativeAI]
-    if app_config.llm_provider == "custom":
-        if not app_config.llm_api_base_url:
-            raise ValueError("LLM_API_BASE_URL must be set for custom LLM provider.")
-        llm = ChatOpenAI(
-            model=app_config.llm_model_name or "gpt-3.5-turbo",
-            base_url=app_config.llm_api_base_url,
-            api_key=llm_api_key_to_use,
-            temperature=1.0, max_retries=2,
-        )
-    elif app_config.llm_provider == "openai":
-        llm = ChatOpenAI(
-            model=app_config.llm_model_name or "gpt-3.5-turbo",
-            api_key=llm_api_key_to_use or openai_api_key_env,
-            temperature=1.0, max_retries=2,
-        )
-    else: # Default to google
-        llm = ChatGoogleGenerativeAI(
-            model=app_config.query_generator_model,
-            temperature=1.0, max_retries=2,
-            api_key=os.getenv("GEMINI_API_KEY") if app_config.llm_provider == "google" else None,
-        )
+    if app_config.llm_provider in ["custom", "openai"]:
+        query_model = app_config.llm_model_name or "gpt-3.5-turbo"
+    else:
+        query_model = app_config.query_generator_model
+    llm = _get_llm(
+        app_config.llm_provider, LLMSpec(query_model, 1.0),
+        app_config.llm_api_base_url, app_config.llm_api_key,
+    )
     
     structured_llm_method_kwargs = {}
-    if isinstance(llm, ChatOpenAI):
+    if app_config.llm_provider in ["custom", "openai"]: # Built as ChatOpenAI
         # Use json_mode for ChatOpenAI to potentially avoid tool_choice object issues
         structured_llm_method_kwargs["method"] = "json_mode" 
         # Ensure the model used supports JSON mode. Most recent OpenAI models do.
@@ -116,93 +184,191 @@ def generate_query(state: OverallState, config: RunnableConfig) -> dict:
     structured_llm = llm.with_structured_output(SearchQueryList, **structured_llm_method_kwargs)
 
     current_date = get_current_date()
-    messages = state.get("messages", [])
-    formatted_prompt = query_writer_instructions.format(
+    research_topic = get_research_topic(state.get("messages", []))
+    formatted_prompt = _QUERY_WRITER_PROMPT(
         current_date=current_date,
-        research_topic=get_research_topic(messages),
+        research_topic=research_topic,
         number_queries=initial_query_count,
     )
     result: SearchQueryList = structured_llm.invoke(formatted_prompt) # type: ignore 
-    return {"query_list": result.query, "initial_search_query_count": initial_query_count}
+    return {
+        "query_list": result.query,
+        "initial_search_query_count": initial_query_count,
+        "research_topic": research_topic,
+    }
 
 def continue_to_web_research(state: OverallState, config: RunnableConfig) -> List[Send]:
+    config_overrides = _get_config_from_state(state)
+
     query_list = state.get("query_list", [])
     sends = []
     for idx, search_query_item in enumerate(query_list):
         actual_query_str = search_query_item.get("query") if isinstance(search_query_item, dict) else str(search_query_item)
         if actual_query_str:
-             sends.append(Send("web_research", {"search_query": actual_query_str, "id": str(idx)}))
+             sends.append(Send("web_research", {"search_query": actual_query_str, "id": str(idx), "config_overrides": config_overrides}))
     return sends
 
-def web_research(state: OverallState, config: RunnableConfig) -> dict:
-    state_cfg_override = _get_config_from_state(state)
-    app_config = Configuration.from_runnable_config(config, state_config_override=state_cfg_override)
+def _web_research_config(state: WebSearchState, config: RunnableConfig) -> Configuration:
+    """Return the run's configuration for a web_research branch.
+
+    ``Send`` payloads carry the run's state overrides (the UI settings), which
+    are otherwise not part of the branch state. Values from the server
+    environment, API keys included, are resolved here and never put into the
+    payload, which is checkpointed and streamed. The build is memoized on the
+    overrides, so every branch hits the cache.
+    """
+    return Configuration.from_runnable_config(config, state_config_override=state.get("config_overrides"))
+
+# Separator between web research results in the reflection/answer prompts
+_SUMMARY_SEPARATOR = "\n\n---\n\n"
+
+def _web_research_update(
+    sources_gathered: List[Source], search_query: List[str], web_research_outputs: List[str]
+) -> dict:
+    """Build the web_research state update.
 
+    Besides the result list, each result is appended to ``web_research_summary``
+    (prefixed with the separator) so later nodes don't re-join every result.
+    """
+    return {
+        "sources_gathered": sources_gathered,
+        "search_query": search_query,
+        "web_research_result": web_research_outputs,
+        "web_research_summary": "".join(_SUMMARY_SEPARATOR + output for output in web_research_outputs),
+    }
+
+def _web_research_summary(state: OverallState) -> str:
+    """Return all web research results joined by the separator."""
+    summary = state.get("web_research_summary")
+    if summary is None:
+        return _SUMMARY_SEPARATOR.join(state.get("web_research_result", []))
+    return summary.removeprefix(_SUMMARY_SEPARATOR)
+
+def _invalid_search_query_output() -> dict:
+    return _web_research_update([], [], ["Error: Invalid or no search query provided."])
+
+def _google_search_request(app_config: Configuration, search_query: str) -> Dict[str, Any]:
+    """Build the generate_content arguments for a grounded Google Search."""
+    formatted_prompt = _WEB_SEARCHER_PROMPT(
+        current_date=get_current_date(),
+        research_topic=search_query,
+    )
+    return {
+        "model": app_config.query_generator_model, # This is for Google Search, not the main LLM
+        "contents": formatted_prompt,
+        "config": {"tools": [{"google_search": {}}], "temperature": 0,},
+    }
+
+def _google_research_output(state: WebSearchState, search_query: str, response: Any) -> dict:
+    """Turn a grounded Google Search response into the web_research state update."""
     web_research_outputs = []
     sources_gathered_outputs = []
+
+    grounding_chunks = None
+    if response.candidates and response.candidates[0].grounding_metadata: # type: ignore
+        grounding_chunks = response.candidates[0].grounding_metadata.grounding_chunks # type: ignore
     
+    if not grounding_chunks:
+        web_research_outputs.append(f"No results or grounding metadata from Google Search for: {search_query}")
+    else:
+        resolved_urls = resolve_urls(grounding_chunks, state.get("id", "0"))
+        citations = get_citations(response, resolved_urls) # type: ignore
+        modified_text = insert_citation_markers(response.text or "", citations) # type: ignore
+        current_sources_gathered = [
+            Source(label=item["label"], short_url=item["short_url"], value=item["value"])
+            for citation in citations for item in citation["segments"]
+        ]
+        web_research_outputs.append(modified_text)
+        sources_gathered_outputs.extend(current_sources_gathered)
+
+    return _web_research_update(sources_gathered_outputs, [search_query], web_research_outputs)
+
+def _search_research_output(
+    state: WebSearchState, search_query: str, search_results_obj: Optional[SearchResults]
+) -> dict:
+    """Turn Brave/SearxNG results into the web_research state update."""
+    web_research_outputs = []
+    sources_gathered_outputs = []
+
+    if search_results_obj and search_results_obj.results:
+        combined_snippets = []
+        for i, res_item in enumerate(search_results_obj.results):
+            combined_snippets.append(f"[{i+1}] {res_item.title}\n{res_item.snippet}\nURL: {res_item.url}")
+            sources_gathered_outputs.append(Source(
+                id=f"{state.get('id', '0')}_{i}", title=res_item.title, url=res_item.url, value=res_item.url,
+                short_url=res_item.url, segments=[{"text": res_item.snippet or "", "url": res_item.url, "title": res_item.title }]
+            ))
+        web_research_outputs.append("\n\n---\n\n".join(combined_snippets))
+    else:
+        web_research_outputs.append(f"No results found or error in search for: {search_query}")
+
+    return _web_research_update(sources_gathered_outputs, [search_query], web_research_outputs)
+
+class _SearchCall(NamedTuple):
+    """What a web_research branch searches, resolved from the run's configuration."""
+    provider: str
+    query: str
+    target: Any # Brave API key, SearxNG base URL or Google generate_content arguments
+
+def _web_research_call(state: WebSearchState, config: RunnableConfig) -> Optional[_SearchCall]:
+    """Validate the branch input and resolve its search; None for an invalid query."""
+    app_config = _web_research_config(state, config)
+
     current_search_query = state.get("search_query")
     if not isinstance(current_search_query, str) or not current_search_query:
-        return {"sources_gathered": [], "search_query": [], "web_research_result": ["Error: Invalid or no search query provided."]}
-
-    search_query_for_output = [current_search_query]
+        return None
 
-    if app_config.search_api_provider == "brave":
+    provider = app_config.search_api_provider
+    if provider == "brave":
         if not app_config.search_api_key:
             raise ValueError("SEARCH_API_KEY must be set for Brave Search.")
-        search_results_obj = brave_search(current_search_query, app_config.search_api_key)
-    elif app_config.search_api_provider == "searxng":
+        return _SearchCall(provider, current_search_query, app_config.search_api_key)
+    elif provider == "searxng":
         if not app_config.searxng_base_url:
             raise ValueError("SEARXNG_BASE_URL must be set for SearxNG.")
-        search_results_obj = searxng_search(current_search_query, app_config.searxng_base_url)
-    elif app_config.search_api_provider == "google":
-        if not genai_client:
-             raise ValueError("Google GenAI client not initialized. Check GEMINI_API_KEY.")
-        formatted_prompt = web_searcher_instructions.format(
-            current_date=get_current_date(),
-            research_topic=current_search_query,
-        )
-        response = genai_client.models.generate_content(
-            model=app_config.query_generator_model, # This is for Google Search, not the main LLM
-            contents=formatted_prompt,
-            config={"tools": [{"google_search": {}}], "temperature": 0,},
-        )
-        
-        grounding_chunks = None
-        if response.candidates and response.candidates[0].grounding_metadata: # type: ignore
-            grounding_chunks = response.candidates[0].grounding_metadata.grounding_chunks # type: ignore
-        
-        if not grounding_chunks:
-            web_research_outputs.append(f"No results or grounding metadata from Google Search for: {current_search_query}")
-            search_results_obj = None
-        else:
-            resolved_urls = resolve_urls(grounding_chunks, state.get("id", "0"))
-            citations = get_citations(response, resolved_urls) # type: ignore
-            modified_text = insert_citation_markers(response.text or "", citations) # type: ignore
-            current_sources_gathered = [item for citation in citations for item in citation["segments"]]
-            web_research_outputs.append(modified_text)
-            sources_gathered_outputs.extend(current_sources_gathered)
-            search_results_obj = None
+        return _SearchCall(provider, current_search_query, app_config.searxng_base_url)
+    elif provider == "google":
+        return _SearchCall(provider, current_search_query, _google_search_request(app_config, current_search_query))
     else:
-        raise ValueError(f"Unsupported search API provider: {app_config.search_api_provider}")
-
-    if app_config.search_api_provider != "google" and search_results_obj and search_results_obj.results:
-        combined_snippets = []
-        for i, res_item in enumerate(search_results_obj.results):
-            combined_snippets.append(f"[{i+1}] {res_item.title}\n{res_item.snippet}\nURL: {res_item.url}")
-            sources_gathered_outputs.append({
-                "id": f"{state.get('id', '0')}_{i}", "title": res_item.title, "url": res_item.url, "value": res_item.url,
-                "short_url": res_item.url, "segments": [{"text": res_item.snippet or "", "url": res_item.url, "title": res_item.title }]
-            })
-        web_research_outputs.append("\n\n---\n\n".join(combined_snippets))
-    elif app_config.search_api_provider != "google" and (not search_results_obj or not search_results_obj.results):
-        web_research_outputs.append(f"No results found or error in search for: {current_search_query}")
-
-    return {
-        "sources_gathered": sources_gathered_outputs,
-        "search_query": search_query_for_output,
-        "web_research_result": web_research_outputs,
-    }
+        raise ValueError(f"Unsupported search API provider: {provider}")
+
+def _web_research_output(state: WebSearchState, call: _SearchCall, response: Any) -> dict:
+    if call.provider == "google":
+        return _google_research_output(state, call.query, response)
+    return _search_research_output(state, call.query, response)
+
+def web_research(state: WebSearchState, config: RunnableConfig) -> dict:
+    """Run a single search query. Synchronous variant, used by ``graph.invoke``."""
+    call = _web_research_call(state, config)
+    if call is None:
+        return _invalid_search_query_output()
+
+    if call.provider == "brave":
+        response = brave_search(call.query, call.target)
+    elif call.provider == "searxng":
+        response = searxng_search(call.query, call.target)
+    else:
+        response = _get_genai_client().models.generate_content(**call.target)
+    return _web_research_output(state, call, response)
+
+async def aweb_research(state: WebSearchState, config: RunnableConfig) -> dict:
+    """Run a single search query on the event loop.
+
+    Used by ``graph.ainvoke``/``astream`` (and so by the LangGraph server), so
+    the parallel ``Send`` branches overlap their network round-trips. Differs
+    from ``web_research`` only in the awaited calls.
+    """
+    call = _web_research_call(state, config)
+    if call is None:
+        return _invalid_search_query_output()
+
+    if call.provider == "brave":
+        response = await brave_search_async(call.query, call.target)
+    elif call.provider == "searxng":
+        response = await searxng_search_async(call.query, call.target)
+    else:
+        response = await _get_genai_client().aio.models.generate_content(**call.target)
+    return _web_research_output(state, call, response)
 
 def reflection(state: OverallState, config: RunnableConfig) -> dict:
     state_cfg_override = _get_config_from_state(state)
@@ -219,50 +385,20 @@ def reflection(state: OverallState, config: RunnableConfig) -> dict:
     elif reasoning_model_name_from_state and app_config.llm_provider == "google":
         effective_reflection_model = reasoning_model_name_from_state
 
-
-    llm_api_key_to_use: Optional[SecretStr] = None
-    if app_config.llm_api_key:
-        llm_api_key_to_use = SecretStr(app_config.llm_api_key)
-    
-    openai_api_key_env: Optional[SecretStr] = None
-    openai_env_val = os.getenv("OPENAI_API_KEY")
-    if openai_env_val:
-        openai_api_key_env = SecretStr(openai_env_val)
-
     current_date = get_current_date()
-    messages = state.get("messages", [])
-    web_results = state.get("web_research_result", [])
-    formatted_prompt = reflection_instructions.format(
+    formatted_prompt = _REFLECTION_PROMPT(
         current_date=current_date,
-        research_topic=get_research_topic(messages),
-        summaries="\n\n---\n\n".join(web_results),
+        research_topic=_research_topic(state),
+        summaries=_web_research_summary(state),
     )
 
-    llm: Union[ChatOpenAI, ChatGoogleGenerativeAI]
-    if app_config.llm_provider == "custom":
-        if not app_config.llm_api_base_url:
-            raise ValueError("LLM_API_BASE_URL must be set for custom LLM provider.")
-        llm = ChatOpenAI(
-            model=effective_reflection_model,
-            base_url=app_config.llm_api_base_url,
-            api_key=llm_api_key_to_use,
-            temperature=1.0, max_retries=2,
-        )
-    elif app_config.llm_provider == "openai":
-        llm = ChatOpenAI(
-            model=effective_reflection_model,
-            api_key=llm_api_key_to_use or openai_api_key_env,
-            temperature=1.0, max_retries=2,
-        )
-    else: # Default to google
-        llm = ChatGoogleGenerativeAI(
-            model=effective_reflection_model,
-            temperature=1.0, max_retries=2,
-            api_key=os.getenv("GEMINI_API_KEY") if app_config.llm_provider == "google" else None,
-        )
+    llm = _get_llm(
+        app_config.llm_provider, LLMSpec(effective_reflection_model, 1.0),
+        app_config.llm_api_base_url, app_config.llm_api_key,
+    )
 
     structured_llm_method_kwargs = {}
-    if isinstance(llm, ChatOpenAI):
+    if app_config.llm_provider in ["custom", "openai"]: # Built as ChatOpenAI
         structured_llm_method_kwargs["method"] = "json_mode"
 
     structured_llm = llm.with_structured_output(Reflection, **structured_llm_method_kwargs)
@@ -298,6 +434,7 @@ def evaluate_research(state: OverallState, config: RunnableConfig) -> Union[str,
     else:
         follow_up_queries_from_reflection = state.get("follow_up_queries", [])
         number_ran = state.get("number_of_ran_queries", 0)
+        config_overrides = _get_config_from_state(state)
         sends = []
 
         for idx, fq_text in enumerate(follow_up_queries_from_reflection):
@@ -306,7 +443,7 @@ def evaluate_research(state: OverallState, config: RunnableConfig) -> Union[str,
                 actual_query_str = fq_text.get("query")
             
             if isinstance(actual_query_str, str) and actual_query_str.strip():
-                payload = { "search_query": actual_query_str, "id": str(number_ran + idx) }
+                payload = { "search_query": actual_query_str, "id": str(number_ran + idx), "config_overrides": config_overrides }
                 sends.append(Send("web_research", payload))
 
         if not sends:
@@ -327,74 +464,66 @@ def finalize_answer(state: OverallState, config: RunnableConfig) -> dict:
     elif reasoning_model_name_from_state and app_config.llm_provider == "google":
          effective_answer_model = reasoning_model_name_from_state
 
-    llm_api_key_to_use: Optional[SecretStr] = None
-    if app_config.llm_api_key:
-        llm_api_key_to_use = SecretStr(app_config.llm_api_key)
-        
-    openai_api_key_env: Optional[SecretStr] = None
-    openai_env_val = os.getenv("OPENAI_API_KEY")
-    if openai_env_val:
-        openai_api_key_env = SecretStr(openai_env_val)
-
     current_date = get_current_date()
-    messages = state.get("messages", [])
-    web_results = state.get("web_research_result", [])
-    formatted_prompt = answer_instructions.format(
+    formatted_prompt = _ANSWER_PROMPT(
         current_date=current_date,
-        research_topic=get_research_topic(messages),
-        summaries="\n---\n\n".join(web_results),
+        research_topic=_research_topic(state),
+        summaries=_web_research_summary(state),
     )
 
-    llm: Union[ChatOpenAI, ChatGoogleGenerativeAI]
-    if app_config.llm_provider == "custom":
-        if not app_config.llm_api_base_url:
-            raise ValueError("LLM_API_BASE_URL must be set for custom LLM provider.")
-        llm = ChatOpenAI(
-            model=effective_answer_model,
-            base_url=app_config.llm_api_base_url,
-            api_key=llm_api_key_to_use,
-            temperature=0, max_retries=2,
-        )
-    elif app_config.llm_provider == "openai":
-        llm = ChatOpenAI(
-            model=effective_answer_model,
-            api_key=llm_api_key_to_use or openai_api_key_env,
-            temperature=0, max_retries=2,
-        )
-    else: # Default to google
-        llm = ChatGoogleGenerativeAI(
-            model=effective_answer_model,
-            temperature=0, max_retries=2,
-            api_key=os.getenv("GEMINI_API_KEY") if app_config.llm_provider == "google" else None,
-        )
+    llm = _get_llm(
+        app_config.llm_provider, LLMSpec(effective_answer_model, 0.0),
+        app_config.llm_api_base_url, app_config.llm_api_key,
+    )
     result = llm.invoke(formatted_prompt)
     
     final_content = result.content
     if not isinstance(final_content, str):
         final_content = str(final_content)
 
-    unique_sources = []
     sources_gathered = state.get("sources_gathered", [])
+    url_replacements: Dict[str, str] = {}
+    for source in sources_gathered:
+        short_url, original_url = source.get("short_url"), source.get("value")
+        if short_url and original_url and short_url != original_url:
+            url_replacements[short_url] = original_url
+    used_short_urls = set()
+    if url_replacements:
+        # Single pass over the answer; longest first so no short URL shadows
+        # another. The callback records which short URLs were actually cited.
+        url_pattern = re.compile("|".join(
+            re.escape(short_url) for short_url in sorted(url_replacements, key=len, reverse=True)
+        ))
+
+        def _expand_short_url(match: "re.Match[str]") -> str:
+            short_url = match.group(0)
+            used_short_urls.add(short_url)
+            return url_replacements[short_url]
+
+        final_content = url_pattern.sub(_expand_short_url, final_content)
+
+    unique_sources = []
+    seen_source_keys = set()
     for source in sources_gathered:
         short_url = source.get("short_url")
         original_url = source.get("value")
-        if short_url and original_url and short_url in final_content:
-            final_content = final_content.replace(short_url, original_url)
-            if source not in unique_sources:
-                 unique_sources.append(source)
-        elif original_url and original_url in final_content: # type: ignore
-            if source not in unique_sources:
-                 unique_sources.append(source)
+        if short_url not in used_short_urls and not (original_url and original_url in final_content):
+            continue
+        source_key = short_url or original_url
+        if source_key not in seen_source_keys:
+            seen_source_keys.add(source_key)
+            unique_sources.append(source)
 
     return {
         "messages": [AIMessage(content=final_content)],
         "sources_gathered": unique_sources,
+        "cited_sources": unique_sources, # sources_gathered keeps every gathered source
     }
 
 builder = StateGraph(OverallState, config_schema=RunnableConfig)
 
 builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
+builder.add_node("web_research", RunnableLambda(web_research, afunc=aweb_research, name="web_research"))
 builder.add_node("reflection", reflection)
 builder.add_node("finalize_answer", finalize_answer)
 
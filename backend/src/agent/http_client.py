@@ -0,0 +1,35 @@
+import asyncio
+import weakref
+
+import httpx
+
+# Async HTTP clients shared by the search tools, one per event loop. Within a
+# loop, requests to the same hosts reuse pooled HTTP/2 connections instead of
+# paying a TCP+TLS handshake per call, and HTTP/2 (via the h2 extra) lets
+# concurrent Brave queries share a single multiplexed connection. Pooled
+# connections are bound to the loop that opened them, so a client is never
+# reused across loops (e.g. successive asyncio.run calls); entries go away
+# with their loop. The transport retries failed connection attempts; unlike
+# the requests session in agent.search_tools it does not retry on 429/5xx.
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def get_client() -> httpx.AsyncClient:
+    """Return the running event loop's shared client, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=32),
+        )
+        client = _CLIENTS[loop] = httpx.AsyncClient(transport=transport, timeout=30.0)
+    return client
+
+async def aclose_client() -> None:
+    """Close the running event loop's shared client, if it was created."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
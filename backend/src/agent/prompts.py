@@ -1,11 +1,33 @@
+import functools
+import time
 from datetime import datetime
+from string import Formatter
+from typing import Any, Callable
 
 
-# Get current date in a readable format
-def get_current_date():
+@functools.lru_cache(maxsize=1)
+def _current_date_for_minute(minute: int) -> str:
     return datetime.now().strftime("%B %d, %Y")
 
 
+# Get current date in a readable format; formatted at most once a minute
+def get_current_date():
+    return _current_date_for_minute(int(time.time()) // 60)
+
+
+# Parse a str.format template once; the returned callable only joins parts
+def compile_prompt(template: str) -> Callable[..., str]:
+    parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+    def render(**values: Any) -> str:
+        return "".join(
+            literal if field is None else f"{literal}{values[field]}"
+            for literal, field in parts
+        )
+
+    return render
+
+
 query_writer_instructions = """Your goal is to generate sophisticated and diverse web search queries. These queries are intended for an advanced automated web research tool capable of analyzing complex results, following links, and synthesizing information.
 
 Instructions:
@@ -1,22 +1,361 @@
+import functools
+import itertools
+import threading
+import time
+from cachetools import TTLCache
+import httpx
+import ijson
+import msgspec
 import requests
-from typing import List, Optional
-from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
 import logging
 
+from agent.http_client import get_client
+from agent.utils import canonical_url
+
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SearchResultItem(BaseModel):
+# Plain data carriers: msgspec Structs are slotted and cheap to build
+class SearchResultItem(msgspec.Struct):
     """Represents a single search result item."""
-    url: str
-    title: str
-    snippet: Optional[str] = None
+    # Optional so a result with a null field decodes instead of failing the
+    # whole response; nulls become "" below.
+    url: Optional[str] = ""
+    title: Optional[str] = ""
+    snippet: Optional[str] = ""
+
+    def __post_init__(self) -> None:
+        # Runs for decoded items too
+        if self.url is None:
+            self.url = ""
+        if self.title is None:
+            self.title = ""
+        if self.snippet is None:
+            self.snippet = ""
 
-class SearchResults(BaseModel):
+class SearchResults(msgspec.Struct):
     """Represents a list of search results."""
     results: List[SearchResultItem]
 
+# Provider response shapes. Response bodies are decoded straight into these
+# (and thus into SearchResultItem) without building intermediate dicts;
+# fields not declared here are skipped by the decoder.
+class _BraveWeb(msgspec.Struct):
+    results: Optional[List[SearchResultItem]] = None
+
+class _BraveResponse(msgspec.Struct):
+    web: Optional[_BraveWeb] = None
+    warnings: Any = None
+    errors: Any = None
+
+class _SearxngItem(SearchResultItem):
+    # SearxNG uses 'content' for snippet
+    snippet: Optional[str] = msgspec.field(default="", name="content")
+
+class _SearxngResponse(msgspec.Struct):
+    results: Optional[List[_SearxngItem]] = None
+
+_BRAVE_DECODER = msgspec.json.Decoder(_BraveResponse)
+_SEARXNG_DECODER = msgspec.json.Decoder(_SearxngResponse)
+
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+# Both providers compress JSON when asked; brotli must be installed for the
+# "br" responses to be decoded by urllib3/httpx.
+_ACCEPT_ENCODING = "gzip, br"
+_BRAVE_HEADERS_TMPL = {"Accept": "application/json", "Accept-Encoding": _ACCEPT_ENCODING}
+_SEARXNG_HEADERS = {"Accept-Encoding": _ACCEPT_ENCODING}
+
+# Shared session for the synchronous search functions: keeps connections to
+# Brave/SearxNG alive between queries instead of a new TCP+TLS setup per call.
+# The async functions use the httpx clients from agent.http_client, which
+# retry connection failures only; 429/5xx responses are not retried there and
+# count towards the circuit breaker below straight away.
+_SESSION = requests.Session()
+_SESSION.headers.update(_BRAVE_HEADERS_TMPL)
+_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        connect=2,
+        read=2,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        allowed_methods=frozenset({"GET"}),
+    ),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+def close_session() -> None:
+    """Close the pooled connections of the synchronous search session."""
+    _SESSION.close()
+
+# Per-host circuit breaker: after _BREAKER_THRESHOLD consecutive failed
+# requests (retries included) a host is skipped for _BREAKER_COOLDOWN seconds,
+# so a rate-limited or down provider is not hammered by every research branch.
+# Once the cooldown passes a single probe request is let through while the
+# breaker stays open for everyone else; the probe failing re-opens it, the
+# probe succeeding resets it.
+_BREAKER_THRESHOLD = 5
+_BREAKER_COOLDOWN = 30.0
+_BREAKER: Dict[str, Tuple[int, float]] = {}  # host -> (consecutive failures, open until)
+_BREAKER_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=16)
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+def _circuit_allows(host: str) -> bool:
+    with _BREAKER_LOCK:
+        state = _BREAKER.get(host)
+        if state is None or not state[1]:
+            return True
+        now = time.monotonic()
+        if state[1] > now:
+            return False
+        # Half-open: this caller is the probe, keep the rest out meanwhile
+        _BREAKER[host] = (state[0], now + _BREAKER_COOLDOWN)
+        return True
+
+def _circuit_success(host: str) -> None:
+    with _BREAKER_LOCK:
+        _BREAKER.pop(host, None)
+
+def _circuit_failure(host: str) -> None:
+    with _BREAKER_LOCK:
+        failures = _BREAKER.get(host, (0, 0.0))[0] + 1
+        open_until = time.monotonic() + _BREAKER_COOLDOWN if failures >= _BREAKER_THRESHOLD else 0.0
+        _BREAKER[host] = (failures, open_until)
+    if open_until:
+        logger.warning("Circuit breaker opened for %s after %s consecutive failures", host, failures)
+
+# Results of recent searches keyed by (provider, instance, normalized query).
+# Research loops often repeat a query across iterations or parallel branches.
+_SEARCH_CACHE: "TTLCache[Tuple[str, str, str], SearchResults]" = TTLCache(maxsize=1024, ttl=900)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+def _search_cache_key(provider: str, query: str, instance: str = "") -> Tuple[str, str, str]:
+    return (provider, instance, query.strip().lower())
+
+def _cached_search(key: Tuple[str, str, str]) -> Optional[SearchResults]:
+    with _SEARCH_CACHE_LOCK:
+        return _SEARCH_CACHE.get(key)
+
+def _cache_search(key: Tuple[str, str, str], results: SearchResults) -> SearchResults:
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE[key] = results
+    return results
+
+def clear_search_cache() -> None:
+    """Drop all cached search results."""
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE.clear()
+
+def _unique_by_url(items: List[SearchResultItem]) -> List[SearchResultItem]:
+    # Providers often list the same page more than once (e.g. with and
+    # without an anchor); each duplicate costs tokens in every later prompt.
+    seen = set()
+    unique = []
+    for item in items:
+        key = canonical_url(item.url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+def _brave_results(body: bytes) -> SearchResults:
+    """Build SearchResults from a raw Brave Search API response body."""
+    data = _BRAVE_DECODER.decode(body)
+    if data.web is not None and data.web.results is not None:
+        results = _unique_by_url(data.web.results)
+    else:
+        results = []
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("Brave search response did not contain 'web.results'.")
+            if data.warnings is not None:
+                logger.warning("Brave API warnings: %s", data.warnings)
+        if data.errors is not None:
+            logger.error("Brave API errors: %s", data.errors)
+
+    return SearchResults(results=results)
+
+def _searxng_results(body: bytes) -> SearchResults:
+    """Build SearchResults from a raw SearxNG JSON response body."""
+    data = _SEARXNG_DECODER.decode(body)
+    if data.results is not None:
+        results = _unique_by_url(data.results)
+    else:
+        results = []
+        logger.warning("SearxNG search response did not contain 'results'.")
+
+    return SearchResults(results=results)
+
+# SearxNG bodies at least this large (decoded) are parsed incrementally: the
+# typed decoder is faster for typical sizes, a streaming parser keeps peak
+# memory down for huge multi-engine responses. Content-Length can't decide
+# this, it is the compressed size and JSON compresses very well.
+_SEARXNG_STREAM_THRESHOLD = 256 * 1024
+_SEARCH_CHUNK_SIZE = 64 * 1024
+
+def _searxng_results_chunks(chunks: Iterator[bytes]) -> SearchResults:
+    """Build SearchResults from the decoded body chunks of a SearxNG response.
+
+    Buffers up to the threshold; bodies that stay below it are decoded in one
+    go, larger ones continue through the streaming parser.
+    """
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= _SEARXNG_STREAM_THRESHOLD:
+            return _searxng_results_stream(itertools.chain(head, chunks))
+    return _searxng_results(b"".join(head))
+
+def _searxng_results_stream(chunks: Iterable[bytes]) -> SearchResults:
+    """Build SearchResults by streaming the 'results' array of a SearxNG response."""
+    # ijson yields dicts; `item.get(key) or ""` also maps explicit nulls to ""
+    # Duplicates are skipped before an item is built
+    make_item = SearchResultItem
+    seen = set()
+    results = []
+
+    def collect(items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            url = item.get("url") or ""
+            key = canonical_url(url)
+            if key not in seen:
+                seen.add(key)
+                results.append(make_item(url=url, title=item.get("title") or "", snippet=item.get("content") or ""))
+        del items[:]
+
+    # Push parser: fed the chunks as they arrive
+    parsed = ijson.sendable_list()
+    parser = ijson.items_coro(parsed, "results.item")
+    for chunk in chunks:
+        parser.send(chunk)
+        collect(parsed)
+    parser.close()
+    collect(parsed)
+    return SearchResults(results=results)
+
+@functools.lru_cache(maxsize=8)
+def _brave_headers(api_key: str) -> Dict[str, str]:
+    # Built once per API key; requests/httpx merge but never mutate these
+    return {**_BRAVE_HEADERS_TMPL, "X-Subscription-Token": api_key}
+
+@functools.lru_cache(maxsize=8)
+def _searxng_search_url(base_url: str) -> str:
+    # Computed once per configured instance; the trailing slash is dropped to
+    # avoid double slashes
+    return f"{base_url.removesuffix('/')}/search"
+
+class _SearchRequest(NamedTuple):
+    """One provider search, minus the I/O: shared by the sync and async functions."""
+    provider: str # For log messages
+    query: str
+    cache_key: Tuple[str, str, str]
+    host: str
+    url: str
+    params: Dict[str, str]
+    headers: Dict[str, str]
+    parse: Callable[[Iterator[bytes]], SearchResults] # Decoded body chunks -> results
+
+def _brave_results_chunks(chunks: Iterator[bytes]) -> SearchResults:
+    return _brave_results(b"".join(chunks))
+
+def _brave_request(query: str, api_key: str) -> _SearchRequest:
+    return _SearchRequest(
+        "Brave", query, _search_cache_key("brave", query), _host(BRAVE_SEARCH_URL),
+        BRAVE_SEARCH_URL, {"q": query}, _brave_headers(api_key), _brave_results_chunks,
+    )
+
+def _searxng_request(query: str, base_url: str) -> _SearchRequest:
+    search_url = _searxng_search_url(base_url)
+    return _SearchRequest(
+        "SearxNG", query, _search_cache_key("searxng", query, base_url), _host(search_url),
+        search_url, {"q": query, "format": "json"}, _SEARXNG_HEADERS, _searxng_results_chunks,
+    )
+
+def _skip_search(request: _SearchRequest) -> Tuple[bool, Optional[SearchResults]]:
+    """Return (True, outcome) if the search is settled without a request.
+
+    The outcome is the cached result, or None while the host's circuit
+    breaker is open.
+    """
+    cached = _cached_search(request.cache_key)
+    if cached is not None:
+        return True, cached
+    if not _circuit_allows(request.host):
+        logger.warning("Skipping %s search, circuit breaker open for %s", request.provider, request.host)
+        return True, None
+    logger.info("Performing %s search for query: %s on %s", request.provider, request.query, request.host)
+    return False, None
+
+def _search_responded(request: _SearchRequest, headers: Any, http_version: str) -> None:
+    _circuit_success(request.host)
+    if logger.isEnabledFor(logging.DEBUG):
+        # Concurrent async queries multiplex over one connection only if HTTP/2 was negotiated
+        logger.debug(
+            "%s search response over %s, content-encoding: %s",
+            request.provider, http_version, headers.get("content-encoding"),
+        )
+
+def _search_finished(request: _SearchRequest, chunks: Iterator[bytes]) -> SearchResults:
+    return _cache_search(request.cache_key, request.parse(chunks))
+
+def _search_failed(request: _SearchRequest, error: Exception) -> None:
+    _circuit_failure(request.host)
+    logger.error("%s search request failed: %s", request.provider, error)
+
+def _search_undecodable(request: _SearchRequest, error: Exception) -> None:
+    logger.error("Error decoding %s search JSON response: %s", request.provider, error)
+
+# Malformed JSON or a response of unexpected shape
+_DECODE_ERRORS = (msgspec.DecodeError, ijson.JSONError)
+
+def _search(request: _SearchRequest) -> Optional[SearchResults]:
+    skip, outcome = _skip_search(request)
+    if skip:
+        return outcome
+    try:
+        with _SESSION.get(
+            request.url, params=request.params, headers=request.headers, timeout=10, stream=True,
+        ) as response:
+            response.raise_for_status()
+            _search_responded(request, response.headers, "HTTP/1.1") # requests speaks nothing else
+            # iter_content undoes the gzip/br content-encoding
+            return _search_finished(request, response.iter_content(chunk_size=_SEARCH_CHUNK_SIZE))
+    except requests.exceptions.RequestException as e: # Includes errors while reading the body stream
+        _search_failed(request, e)
+    except _DECODE_ERRORS as e:
+        _search_undecodable(request, e)
+    return None
+
+async def _search_async(request: _SearchRequest, client: Optional[httpx.AsyncClient]) -> Optional[SearchResults]:
+    skip, outcome = _skip_search(request)
+    if skip:
+        return outcome
+    try:
+        if client is None:
+            client = get_client()
+        response = await client.get(request.url, params=request.params, headers=request.headers, timeout=10)
+        response.raise_for_status()
+        _search_responded(request, response.headers, response.http_version)
+        return _search_finished(request, iter((response.content,)))
+    except httpx.HTTPError as e:
+        _search_failed(request, e)
+    except _DECODE_ERRORS as e:
+        _search_undecodable(request, e)
+    return None
+
 def brave_search(query: str, api_key: str) -> Optional[SearchResults]:
     """
     Performs a search using the Brave Search API.
@@ -28,100 +367,63 @@ def brave_search(query: str, api_key: str) -> Optional[SearchResults]:
     Returns:
         A SearchResults object containing the search results, or None if an error occurs.
     """
-    logger.info(f"Performing Brave search for query: {query}")
-    headers = {
-        "Accept": "application/json",
-        "X-Subscription-Token": api_key,
-    }
-    params = {"q": query}
-    try:
-        response = requests.get(
-            "https://api.search.brave.com/res/v1/web/search",
-            params=params,
-            headers=headers,
-            timeout=10, # Added timeout
-        )
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
-        data = response.json()
+    return _search(_brave_request(query, api_key))
 
-        results = []
-        if "web" in data and "results" in data["web"]:
-            for item in data["web"]["results"]:
-                results.append(
-                    SearchResultItem(
-                        url=item.get("url", ""),
-                        title=item.get("title", ""),
-                        snippet=item.get("snippet", ""),
-                    )
-                )
-        else:
-            logger.warning("Brave search response did not contain 'web.results'.")
-            if "warnings" in data:
-                logger.warning(f"Brave API warnings: {data['warnings']}")
-            if "errors" in data:
-                logger.error(f"Brave API errors: {data['errors']}")
 
+def searxng_search(query: str, base_url: str) -> Optional[SearchResults]:
+    """
+    Performs a search using a self-hosted SearxNG instance.
 
-        return SearchResults(results=results)
+    Args:
+        query: The search query string.
+        base_url: The base URL of the SearxNG instance (e.g., "http://localhost:8888").
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Brave search request failed: {e}")
-        return None
-    except ValueError as e: # Handles JSON decoding errors
-        logger.error(f"Error decoding Brave search JSON response: {e}")
-        return None
+    Returns:
+        A SearchResults object containing the search results, or None if an error occurs.
+    """
+    return _search(_searxng_request(query, base_url))
 
 
-def searxng_search(query: str, base_url: str) -> Optional[SearchResults]:
+async def brave_search_async(
+    query: str, api_key: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[SearchResults]:
     """
-    Performs a search using a self-hosted SearxNG instance.
+    Performs a search using the Brave Search API without blocking the event loop.
 
     Args:
         query: The search query string.
-        base_url: The base URL of the SearxNG instance (e.g., "http://localhost:8888").
+        api_key: The Brave Search API key.
+        client: The async HTTP client to use; defaults to the event loop's shared client.
 
     Returns:
         A SearchResults object containing the search results, or None if an error occurs.
     """
-    logger.info(f"Performing SearxNG search for query: {query} on instance: {base_url}")
-    # Ensure base_url does not end with a slash to avoid double slashes
-    if base_url.endswith("/"):
-        base_url = base_url[:-1]
+    return await _search_async(_brave_request(query, api_key), client)
 
-    search_url = f"{base_url}/search"
-    params = {"q": query, "format": "json"}
 
-    try:
-        response = requests.get(search_url, params=params, timeout=10) # Added timeout
-        response.raise_for_status()
-        data = response.json()
+async def searxng_search_async(
+    query: str, base_url: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[SearchResults]:
+    """
+    Performs a search using a self-hosted SearxNG instance without blocking the event loop.
 
-        results = []
-        if "results" in data:
-            for item in data["results"]:
-                results.append(
-                    SearchResultItem(
-                        url=item.get("url", ""),
-                        title=item.get("title", ""),
-                        snippet=item.get("content", ""), # SearxNG often uses 'content' for snippet
-                    )
-                )
-        else:
-            logger.warning("SearxNG search response did not contain 'results'.")
+    Args:
+        query: The search query string.
+        base_url: The base URL of the SearxNG instance (e.g., "http://localhost:8888").
+        client: The async HTTP client to use; defaults to the event loop's shared client.
 
-        return SearchResults(results=results)
+    Returns:
+        A SearchResults object containing the search results, or None if an error occurs.
+    """
+    return await _search_async(_searxng_request(query, base_url), client)
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"SearxNG search request failed: {e}")
-        return None
-    except ValueError as e: # Handles JSON decoding errors
-        logger.error(f"Error decoding SearxNG search JSON response: {e}")
-        return None
+def _selftest() -> None:
+    """Smoke-test both providers against live endpoints."""
+    # Only needed here; kept out of the module import path
+    import os
 
-if __name__ == '__main__':
-    # This is for basic testing, replace with actual API keys and base URLs
     print("Testing Brave Search (requires BRAVE_API_KEY environment variable):")
-    brave_api_key_env = "YOUR_BRAVE_API_KEY" # Replace with your key or load from env
+    brave_api_key_env = os.environ.get("BRAVE_API_KEY", "YOUR_BRAVE_API_KEY")
     if brave_api_key_env != "YOUR_BRAVE_API_KEY":
         brave_results = brave_search("latest AI advancements", brave_api_key_env)
         if brave_results:
@@ -133,10 +435,7 @@ if __name__ == '__main__':
         print("Skipping Brave Search test as API key is not set.")
 
     print("\nTesting SearxNG Search (requires a running SearxNG instance):")
-    searxng_base_url_env = "http://localhost:8888" # Replace with your SearxNG URL
-    # Example of how you might check if a test URL is provided
-    # import os
-    # searxng_base_url_env = os.environ.get("SEARXNG_TEST_URL", "http://localhost:8888")
+    searxng_base_url_env = os.environ.get("SEARXNG_TEST_URL", "http://localhost:8888")
 
     # A simple check to see if the default URL is being used, you might want to skip if it is.
     if searxng_base_url_env: # Basic check
@@ -148,3 +447,6 @@ if __name__ == '__main__':
             print("SearxNG search returned no results or an error occurred.")
     else:
         print("Skipping SearxNG test as base URL is not set.")
+
+if __name__ == '__main__':
+    _selftest()
@@ -1,22 +1,48 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import TypedDict, Optional # Added Optional
+from typing import Any, Dict, List, TypedDict, Optional # Added Optional
 
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
 import operator
 
+from agent.utils import canonical_url
+
+
+def merge_sources(left: List[Source], right: List[Source]) -> List[Source]:
+    """Reducer for sources_gathered: append only sources not gathered yet.
+
+    Sources are keyed like in finalize_answer (short_url, falling back to the
+    original URL), canonicalized so that Brave/SearxNG hits for the same page
+    from different queries or loops are kept once. The cited subset picked by
+    finalize_answer is published separately as ``cited_sources``.
+    """
+    seen = {canonical_url(source.get("short_url") or source["value"]) for source in left}
+    merged = list(left)
+    for source in right:
+        key = canonical_url(source.get("short_url") or source["value"])
+        if key not in seen:
+            seen.add(key)
+            merged.append(source)
+    return merged
+
+# Graph states stay TypedDicts: LangGraph keeps one channel per key and applies
+# the reducers per channel, so there is no whole-state copy/merge to optimize,
+# and nodes rely on mapping access (state.get) for the optional fields.
 class OverallState(TypedDict, total=False): # Set total=False to make all fields optional by default
     messages: Annotated[list, add_messages]
     search_query: Annotated[list, operator.add]
     web_research_result: Annotated[list, operator.add]
-    sources_gathered: Annotated[list, operator.add]
+    web_research_summary: Annotated[str, operator.add] # Results appended with their separator
+    sources_gathered: Annotated[list, merge_sources]
+    cited_sources: list # Set once by finalize_answer
     initial_search_query_count: int # Will be set by generate_query or from input
     max_research_loops: int # Will be set by reflection/evaluate_research or from input
     research_loop_count: int # Initialized/updated in reflection
     reasoning_model: str # From input
+    research_topic: str # Derived from messages once per run in generate_query
 
     # New fields for UI-driven configuration - these are truly optional
     llm_provider: Optional[str]
@@ -44,7 +70,17 @@ class QueryGenerationState(TypedDict, total=False): # Set total=False
 class WebSearchState(TypedDict, total=False): # Set total=False
     search_query: str
     id: str # This 'id' seems to be an index for parallel searches
+    config_overrides: Dict[str, Any] # UI config overrides of the run that fanned out (_get_config_from_state)
+
+class Source(TypedDict, total=False): # One gathered web source; a plain dict so checkpoints serialize it natively
+    value: str # Original URL
+    short_url: Optional[str] # URL as cited in research text (equals value for Brave/SearxNG)
+    label: str
+    title: str
+    url: str
+    id: str
+    segments: list
 
-@dataclass(kw_only=True)
+@dataclass(slots=True, kw_only=True)
 class SearchStateOutput: # This is not directly part of LangGraph state, seems like a data structure
     running_summary: Optional[str] = field(default=None)
@@ -36,6 +36,13 @@ def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
     return resolved_map
 
 
+def canonical_url(url: str) -> str:
+    """
+    Key for de-duplicating source URLs: the fragment and trailing slash are dropped.
+    """
+    return url.split("#", 1)[0].rstrip("/")
+
+
 def insert_citation_markers(text, citations_list):
     """
     Inserts citation markers into a text string based on start and end indices.
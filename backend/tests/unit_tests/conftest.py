@@ -0,0 +1,5 @@
+import os
+
+# agent.graph refuses to import without a Gemini key when Google is the
+# configured provider; the unit tests never reach the API.
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
@@ -0,0 +1,111 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from agent.app import FastCORS, SPAStatic
+
+ALLOWED_ORIGIN = "http://localhost:5173"
+
+
+@pytest.fixture
+def cors_client():
+    calls = []
+
+    async def endpoint(request):
+        calls.append(request.method)
+        return PlainTextResponse("ok")
+
+    app = FastCORS(Starlette(routes=[Route("/", endpoint, methods=["GET", "OPTIONS"])]), origins=[ALLOWED_ORIGIN])
+    client = TestClient(app)
+    client.calls = calls
+    return client
+
+
+def test_cors_simple_request_from_allowed_origin(cors_client):
+    response = cors_client.get("/", headers={"Origin": ALLOWED_ORIGIN})
+
+    assert response.text == "ok"
+    assert response.headers["access-control-allow-origin"] == ALLOWED_ORIGIN
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["vary"] == "Origin"
+
+
+def test_cors_ignores_other_origins(cors_client):
+    response = cors_client.get("/", headers={"Origin": "http://evil.example"})
+
+    assert response.text == "ok"
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_cors_preflight_is_answered_without_calling_the_app(cors_client):
+    response = cors_client.options(
+        "/",
+        headers={
+            "Origin": ALLOWED_ORIGIN,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type",
+        },
+    )
+
+    assert response.status_code == 204
+    assert response.headers["access-control-allow-origin"] == ALLOWED_ORIGIN
+    assert "POST" in response.headers["access-control-allow-methods"]
+    assert response.headers["access-control-allow-headers"] == "content-type"
+    assert response.headers["access-control-max-age"] == "600"
+    assert cors_client.calls == []
+
+
+def test_cors_plain_options_reaches_the_app(cors_client):
+    response = cors_client.options("/", headers={"Origin": ALLOWED_ORIGIN})
+
+    assert response.text == "ok"
+    assert cors_client.calls == ["OPTIONS"]
+
+
+@pytest.fixture
+def static_client(tmp_path):
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.js").write_text("console.log(1)")
+    (tmp_path.parent / "secret.txt").write_text("secret")
+    return TestClient(Starlette(routes=[Mount("/app", app=SPAStatic(str(tmp_path)))]))
+
+
+def test_static_serves_files_with_etag(static_client):
+    response = static_client.get("/app/assets/app.js")
+
+    assert response.status_code == 200
+    assert response.text == "console.log(1)"
+    assert "javascript" in response.headers["content-type"]
+    assert static_client.get(
+        "/app/assets/app.js", headers={"If-None-Match": response.headers["etag"]}
+    ).status_code == 304
+
+
+def test_static_falls_back_to_index_for_client_routes(static_client):
+    response = static_client.get("/app/research/123")
+
+    assert response.status_code == 200
+    assert response.text == "<html>app</html>"
+
+
+def test_static_missing_files_are_404(static_client):
+    assert static_client.get("/app/assets/missing.js").status_code == 404
+    assert static_client.get("/app/favicon.ico").status_code == 404
+
+
+def test_static_does_not_escape_the_build_dir(static_client):
+    response = static_client.get("/app/..%2Fsecret.txt")
+
+    assert "secret" not in response.text
+
+
+def test_static_head_and_methods(static_client):
+    head = static_client.head("/app/assets/app.js")
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len("console.log(1)"))
+    assert head.content == b""
+
+    assert static_client.post("/app/assets/app.js").status_code == 405
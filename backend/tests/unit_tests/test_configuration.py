@@ -0,0 +1,46 @@
+import pytest
+
+from agent import configuration
+from agent.configuration import Configuration
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.delenv("SEARCH_API_KEY", raising=False)
+    monkeypatch.delenv("MAX_RESEARCH_LOOPS", raising=False)
+    configuration._env_snapshot.cache_clear()
+    configuration._build_config.cache_clear()
+    yield
+    configuration._env_snapshot.cache_clear()
+    configuration._build_config.cache_clear()
+
+
+def test_identical_overrides_return_the_same_instance():
+    first = Configuration.from_runnable_config(None, {"max_research_loops": 3})
+    second = Configuration.from_runnable_config({"configurable": {}}, {"max_research_loops": 3})
+
+    assert first is second
+    assert Configuration.from_runnable_config(None, {"max_research_loops": 4}) is not first
+
+
+def test_overrides_win_over_environment_values(monkeypatch):
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "5")
+
+    assert Configuration.from_runnable_config().max_research_loops == 5
+    assert Configuration.from_runnable_config(None, {"max_research_loops": 1}).max_research_loops == 1
+
+
+def test_none_overrides_are_ignored(monkeypatch):
+    monkeypatch.setenv("SEARCH_API_KEY", "env-key")
+
+    config = Configuration.from_runnable_config(None, {"search_api_key": None})
+
+    assert config.search_api_key == "env-key"
+    assert config is Configuration.from_runnable_config()
+
+
+def test_unhashable_overrides_build_without_the_cache():
+    config = Configuration.from_runnable_config(None, {"search_api_key": bytearray(b"key")})
+
+    assert config.search_api_key == "key"
+    assert configuration._build_config.cache_info().currsize == 0
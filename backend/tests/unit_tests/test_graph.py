@@ -0,0 +1,66 @@
+import asyncio
+import importlib
+
+import pytest
+
+from agent.search_tools import SearchResultItem, SearchResults
+
+graph_module = importlib.import_module("agent.graph")
+
+RESULTS = SearchResults(results=[SearchResultItem(url="https://example.com/a", title="A", snippet="Text")])
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+
+    def search(query, target):
+        calls.append((query, target))
+        return RESULTS
+
+    async def search_async(query, target):
+        return search(query, target)
+
+    for name in ("brave_search", "searxng_search"):
+        monkeypatch.setattr(graph_module, name, search)
+        monkeypatch.setattr(graph_module, f"{name}_async", search_async)
+    return calls
+
+
+def _run_both(state):
+    sync_output = graph_module.web_research(state, {})
+    async_output = asyncio.run(graph_module.aweb_research(state, {}))
+    assert sync_output == async_output
+    return sync_output
+
+
+@pytest.mark.parametrize(
+    "overrides, target",
+    [
+        ({"search_api_provider": "brave", "search_api_key": "key"}, "key"),
+        ({"search_api_provider": "searxng", "searxng_base_url": "http://searx"}, "http://searx"),
+    ],
+)
+def test_web_research_variants_agree(searches, overrides, target):
+    output = _run_both({"search_query": "query", "id": "2", "config_overrides": overrides})
+
+    assert searches == [("query", target), ("query", target)]
+    assert output["search_query"] == ["query"]
+    assert [source["value"] for source in output["sources_gathered"]] == ["https://example.com/a"]
+    assert output["sources_gathered"][0]["id"] == "2_0"
+
+
+def test_web_research_rejects_missing_query(searches):
+    output = _run_both({"search_query": "", "config_overrides": {"search_api_provider": "brave"}})
+
+    assert output["web_research_result"] == ["Error: Invalid or no search query provided."]
+    assert searches == []
+
+
+def test_web_research_requires_brave_key(searches):
+    state = {"search_query": "query", "config_overrides": {"search_api_provider": "brave", "search_api_key": ""}}
+
+    with pytest.raises(ValueError, match="SEARCH_API_KEY"):
+        graph_module.web_research(state, {})
+    with pytest.raises(ValueError, match="SEARCH_API_KEY"):
+        asyncio.run(graph_module.aweb_research(state, {}))
@@ -0,0 +1,32 @@
+import pytest
+
+from agent.prompts import (
+    answer_instructions,
+    compile_prompt,
+    query_writer_instructions,
+    reflection_instructions,
+    web_searcher_instructions,
+)
+
+VALUES = {
+    "current_date": "January 1, 2025",
+    "research_topic": "topic {with braces}",
+    "number_queries": 3,
+    "summaries": "summary",
+}
+
+
+@pytest.mark.parametrize(
+    "template",
+    [query_writer_instructions, web_searcher_instructions, reflection_instructions, answer_instructions],
+)
+def test_compiled_prompts_match_str_format(template):
+    assert compile_prompt(template)(**VALUES) == template.format(**VALUES)
+
+
+def test_compile_prompt_unescapes_braces_and_requires_fields():
+    render = compile_prompt('{{"key": "{value}"}}')
+
+    assert render(value="x") == '{"key": "x"}'
+    with pytest.raises(KeyError):
+        render()
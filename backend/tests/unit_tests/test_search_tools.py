@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from agent import search_tools
+
+
+def test_brave_api_errors_are_logged_when_warnings_are_off(caplog):
+    caplog.set_level(logging.ERROR, logger=search_tools.logger.name)
+
+    results = search_tools._brave_results(b'{"errors": ["quota exceeded"], "warnings": ["slow down"]}')
+
+    assert results.results == []
+    assert [record.getMessage() for record in caplog.records] == ["Brave API errors: ['quota exceeded']"]
+
+
+def test_null_fields_decode_as_empty_strings():
+    body = b'{"results": [{"url": "https://example.com", "title": null, "content": null}, {"url": null}]}'
+
+    results = search_tools._searxng_results(body).results
+
+    assert [(item.url, item.title, item.snippet) for item in results] == [
+        ("https://example.com", "", ""),
+        ("", "", ""),
+    ]
+
+
+def test_searxng_content_maps_to_snippet():
+    body = b'{"results": [{"url": "https://example.com", "title": "Example", "content": "Text", "engine": "x"}]}'
+
+    (item,) = search_tools._searxng_results(body).results
+
+    assert (item.url, item.title, item.snippet) == ("https://example.com", "Example", "Text")
+
+
+def _searxng_body(count: int) -> bytes:
+    items = ",".join(
+        f'{{"url": "https://example.com/{i}", "title": "T{i}", "content": "{"x" * 100}"}}' for i in range(count)
+    )
+    return f'{{"query": "q", "results": [{items}]}}'.encode()
+
+
+def test_searxng_large_decoded_bodies_are_streamed(monkeypatch):
+    body = _searxng_body(50)
+    monkeypatch.setattr(search_tools, "_SEARXNG_STREAM_THRESHOLD", len(body) // 4)
+    streamed = []
+    stream = search_tools._searxng_results_stream
+    monkeypatch.setattr(search_tools, "_searxng_results_stream", lambda chunks: streamed.append(1) or stream(chunks))
+
+    chunks = iter([body[i:i + 100] for i in range(0, len(body), 100)])
+    results = search_tools._searxng_results_chunks(chunks).results
+
+    assert streamed
+    assert [(item.url, item.title, item.snippet) for item in results] == [
+        (item.url, item.title, item.snippet) for item in search_tools._searxng_results(body).results
+    ]
+    assert len(results) == 50
+
+
+def test_searxng_small_bodies_are_decoded_at_once(monkeypatch):
+    monkeypatch.setattr(search_tools, "_searxng_results_stream", None)
+
+    results = search_tools._searxng_results_chunks(iter([_searxng_body(3)])).results
+
+    assert [item.url for item in results] == [f"https://example.com/{i}" for i in range(3)]
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(search_tools, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(search_tools, "_BREAKER", {})
+    return clock
+
+
+def _open_breaker(host):
+    for _ in range(search_tools._BREAKER_THRESHOLD):
+        assert search_tools._circuit_allows(host)
+        search_tools._circuit_failure(host)
+
+
+def test_circuit_breaker_opens_after_consecutive_failures(breaker):
+    _open_breaker("api.example")
+
+    assert not search_tools._circuit_allows("api.example")
+    assert search_tools._circuit_allows("other.example")
+
+
+def test_circuit_breaker_lets_a_single_probe_through_after_cooldown(breaker):
+    _open_breaker("api.example")
+    breaker[0] += search_tools._BREAKER_COOLDOWN + 1
+
+    assert search_tools._circuit_allows("api.example")
+    assert not search_tools._circuit_allows("api.example")
+
+    search_tools._circuit_success("api.example")
+    assert search_tools._circuit_allows("api.example")
+    assert search_tools._circuit_allows("api.example")
+
+
+def test_circuit_breaker_failed_probe_reopens(breaker):
+    _open_breaker("api.example")
+    breaker[0] += search_tools._BREAKER_COOLDOWN + 1
+
+    assert search_tools._circuit_allows("api.example")
+    search_tools._circuit_failure("api.example")
+    breaker[0] += search_tools._BREAKER_COOLDOWN - 1
+
+    assert not search_tools._circuit_allows("api.example")
+
+
+class _FakeResponse:
+    headers = {}
+
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+class _FakeSession:
+    """Stands in for the shared requests session; records each request."""
+
+    def __init__(self):
+        self.urls = []
+        self.fail = False
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if self.fail:
+            raise search_tools.requests.exceptions.ConnectionError("down")
+        return _FakeResponse(b'{"results": [{"url": "https://example.com", "title": "T", "content": "C"}]}')
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = _FakeSession()
+    monkeypatch.setattr(search_tools, "_SESSION", fake)
+    monkeypatch.setattr(search_tools, "_BREAKER", {})
+    search_tools.clear_search_cache()
+    yield fake
+    search_tools.clear_search_cache()
+
+
+def test_repeat_queries_are_served_from_the_cache(session):
+    first = search_tools.searxng_search("Some Query", "http://searx")
+
+    assert search_tools.searxng_search("some query", "http://searx") is first
+    assert search_tools.searxng_search("  SOME QUERY ", "http://searx") is first
+    assert len(session.urls) == 1
+
+
+def test_async_searches_share_the_cache(session):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, content=b'{"results": []}')
+
+    async def search():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await search_tools.searxng_search_async("query", "http://async-searx", client)
+            second = await search_tools.searxng_search_async("Query", "http://async-searx", client)
+        return first, second
+
+    first, second = asyncio.run(search())
+
+    assert first is second
+    assert len(calls) == 1
+    assert search_tools.searxng_search("QUERY", "http://async-searx") is first
+    assert session.urls == []
+
+
+def test_failed_searches_are_not_cached(session):
+    session.fail = True
+    assert search_tools.searxng_search("query", "http://searx") is None
+
+    session.fail = False
+    assert search_tools.searxng_search("query", "http://searx") is not None
+    assert len(session.urls) == 2
+
+
+def test_searxng_instances_do_not_share_entries(session):
+    first = search_tools.searxng_search("query", "http://searx-a")
+    second = search_tools.searxng_search("query", "http://searx-b")
+
+    assert first is not second
+    assert session.urls == ["http://searx-a/search", "http://searx-b/search"]
+
+
+def test_clear_search_cache_empties_it(session):
+    search_tools.searxng_search("query", "http://searx")
+    search_tools.clear_search_cache()
+    search_tools.searxng_search("query", "http://searx")
+
+    assert len(session.urls) == 2
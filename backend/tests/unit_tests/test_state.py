@@ -0,0 +1,87 @@
+import importlib
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from agent.state import OverallState, Source, merge_sources
+
+graph_module = importlib.import_module("agent.graph")
+
+
+def _source(url: str, **fields) -> Source:
+    return Source(value=url, short_url=fields.pop("short_url", url), **fields)
+
+
+def test_merge_sources_skips_canonical_duplicates():
+    left = [_source("https://example.com/a")]
+    right = [
+        _source("https://example.com/a/"),
+        _source("https://example.com/a#section"),
+        _source("https://example.com/b"),
+    ]
+
+    merged = merge_sources(left, right)
+
+    assert [source["value"] for source in merged] == ["https://example.com/a", "https://example.com/b"]
+    assert left == [_source("https://example.com/a")]
+
+
+def test_merge_sources_keeps_distinct_short_urls_for_the_same_page():
+    # Google citations of one page get distinct short URLs; all are needed
+    # to expand the citations in the answer.
+    left = [_source("https://example.com/a", short_url="https://vertexaisearch.cloud.google.com/id/0-0")]
+    right = [_source("https://example.com/a", short_url="https://vertexaisearch.cloud.google.com/id/1-0")]
+
+    assert len(merge_sources(left, right)) == 2
+
+
+class _FakeLLM:
+    def __init__(self, content: str):
+        self.content = content
+
+    def invoke(self, prompt):
+        return AIMessage(content=self.content)
+
+
+def test_finalize_answer_keeps_only_cited_sources(monkeypatch):
+    monkeypatch.setattr(
+        graph_module, "_get_llm", lambda *args: _FakeLLM("See https://example.com/cited for details.")
+    )
+    cited = _source("https://example.com/cited")
+    uncited = _source("https://example.com/uncited")
+
+    builder = StateGraph(OverallState)
+    builder.add_node("gather", lambda state: {"sources_gathered": [cited, uncited]})
+    builder.add_node("finalize_answer", graph_module.finalize_answer)
+    builder.add_edge(START, "gather")
+    builder.add_edge("gather", "finalize_answer")
+    builder.add_edge("finalize_answer", END)
+
+    graph = builder.compile()
+    result = graph.invoke({"messages": [HumanMessage(content="topic")]})
+
+    assert result["cited_sources"] == [cited]
+    assert result["sources_gathered"] == [cited, uncited]
+
+    updates = list(graph.stream({"messages": [HumanMessage(content="topic")]}, stream_mode="updates"))
+    assert updates[-1]["finalize_answer"]["sources_gathered"] == [cited]
+
+
+def test_web_research_summary_matches_the_joined_results():
+    builder = StateGraph(OverallState)
+    builder.add_node("first", lambda state: graph_module._web_research_update([], ["a"], ["result a"]))
+    builder.add_node("second", lambda state: graph_module._web_research_update([], ["b"], ["result b", "result c"]))
+    builder.add_edge(START, "first")
+    builder.add_edge(START, "second")
+    builder.add_edge(["first", "second"], END)
+
+    result = builder.compile().invoke({"messages": [HumanMessage(content="topic")]})
+
+    assert len(result["web_research_result"]) == 3
+    assert graph_module._web_research_summary(result) == "\n\n---\n\n".join(result["web_research_result"])
+
+
+def test_web_research_summary_falls_back_to_the_results():
+    state = OverallState(web_research_result=["result a", "result b"])
+
+    assert graph_module._web_research_summary(state) == "result a\n\n---\n\nresult b"